@@ -1,3 +1,14 @@
+import mmap
+import struct
+import sys
+import threading
+from array import array
+from bisect import bisect_left
+from collections import deque
+from heapq import merge
+from itertools import islice
+from operator import le
+
 class Node:
   def __init__(self, value):
     self.data = value
@@ -26,14 +37,139 @@ class Node:
     for i,n in enumerate(children):
       n.PrintPreOrder(indent, i == len(children) -1 )
 
-class BinaryTree:
+# Streaming traversals with explicit stacks (no recursion limit) and a
+# renderer that writes the tree diagram in large chunks. Subclasses only
+# say how to reach the root, children and key of a node reference.
+
+class TraversalMixin:
+  def preorder(self):
+    stack = [self._rootRef()]
+    while stack:
+      ref = stack.pop()
+      if ref is None:
+        continue
+      yield self._keyOf(ref)
+      stack.append(self._rightOf(ref))
+      stack.append(self._leftOf(ref))
+
+  def postorder(self):
+    stack = [(self._rootRef(), False)]
+    while stack:
+      ref, expanded = stack.pop()
+      if ref is None:
+        continue
+      if expanded:
+        yield self._keyOf(ref)
+      else:
+        stack.append((ref, True))
+        stack.append((self._rightOf(ref), False))
+        stack.append((self._leftOf(ref), False))
+
+  def level_order(self):
+    queue = deque([self._rootRef()])
+    while queue:
+      ref = queue.popleft()
+      if ref is None:
+        continue
+      yield self._keyOf(ref)
+      queue.append(self._leftOf(ref))
+      queue.append(self._rightOf(ref))
+
+  def render(self, stream=None, chunkLines=4096):
+    stream = sys.stdout if stream is None else stream
+    lines = []
+    root = self._rootRef()
+    stack = [(root, '', True)] if root is not None else []
+    while stack:
+      ref, indent, last = stack.pop()
+      lines.append(f'{indent}{"└─" if last else "├─"}{self._keyOf(ref)}')
+      if len(lines) >= chunkLines:
+        lines.append('')
+        stream.write('\n'.join(lines))
+        lines.clear()
+      indent += '  ' if last else '│ '
+      children = [c for c in (self._leftOf(ref), self._rightOf(ref)) if c is not None]
+      for i in reversed(range(len(children))):
+        stack.append((children[i], indent, i == len(children) - 1))
+    if lines:
+      lines.append('')
+      stream.write('\n'.join(lines))
+
+  def save(self, path, typecode='q'):
+    MappedTree.write(path, self.inorder(), typecode)
+
+  @staticmethod
+  def open(path):
+    return MappedTree.open(path)
+
+# Bulk loading: sort once (skipped when the input is already sorted) and
+# build a perfectly balanced tree from the sorted keys in O(n).
+
+def sortedValues(values):
+  keys = values if isinstance(values, list) else [*values]
+  if not all(map(le, keys, islice(keys, 1, None))):
+    keys = sorted(keys)
+  return keys
+
+class BinaryTree(TraversalMixin):
   def __init__(self, list):
     self.root = Node(list[0])
-    for i in list:
+    for i in islice(list, 1, None):
       self.addNode(self.root, i)
+
+  @classmethod
+  def fromSequence(cls, values):
+    keys = sortedValues(values)
+    tree = cls.__new__(cls)
+    tree.root = None
+    stack = [(0, len(keys), None, False)]
+    while stack:
+      lo, hi, parent, isLeft = stack.pop()
+      if lo >= hi:
+        continue
+      mid = (lo + hi) // 2
+      if mid > lo and keys[mid - 1] == keys[mid]:
+        # equal keys always go right, like addNode
+        mid = bisect_left(keys, keys[mid], lo, mid)
+      node = Node(keys[mid])
+      if parent is None:
+        tree.root = node
+      elif isLeft:
+        parent.left = node
+      else:
+        parent.right = node
+      stack.append((mid + 1, hi, node, False))
+      stack.append((lo, mid, node, True))
+    return tree
+
+  def inorder(self):
+    stack = []
+    node = self.root
+    while stack or node:
+      while node:
+        stack.append(node)
+        node = node.left
+      node = stack.pop()
+      yield node.data
+      node = node.right
+
+  def merge(self, other):
+    return type(self).fromSequence(merge(self.inorder(), other.inorder()))
   
   def Print(self):
-    self.root.PrintPreOrder("", True)
+    self.render()
+
+  def _rootRef(self):
+    return self.root
+
+  def _leftOf(self, node):
+    return node.left
+
+  def _rightOf(self, node):
+    return node.right
+
+  def _keyOf(self, node):
+    return node.data
 
   def addNode(self, node, value):
     if value < node.data:
@@ -47,6 +183,721 @@ class BinaryTree:
       else:
         self.addNode(node.right, value)
 
+# Balanced mode: a red-black tree whose nodes live in parallel preallocated
+# arrays instead of per-Node objects. Index 0 is the shared NIL sentinel,
+# insert and search are iterative so sorted input never hits RecursionError.
+# Pass typecode='q' (or 'd') to store numeric keys unboxed. Every node also
+# keeps its subtree size, which gives range queries and order statistics
+# in O(log n + output).
+
+NIL = 0
+RED = 0
+BLACK = 1
+
+class BalancedTree(TraversalMixin):
+  def __init__(self, list=(), capacity=16, typecode=None):
+    self.typecode = typecode
+    capacity += 1
+    if typecode is None:
+      self.keys = [None] * capacity
+    else:
+      self.keys = array(typecode, [0]) * capacity
+    self.left = array('q', [NIL]) * capacity
+    self.right = array('q', [NIL]) * capacity
+    self.parent = array('q', [NIL]) * capacity
+    self.size = array('q', [0]) * capacity
+    self.color = bytearray(capacity)
+    self.color[NIL] = BLACK
+    self.root = NIL
+    self.count = 0
+    for i in list:
+      self.addNode(i)
+
+  @classmethod
+  def fromSequence(cls, values, typecode=None):
+    # Node i holds the i-th smallest key, so the key array is just the
+    # sorted input. Bottom level nodes are red, everything else black.
+    keys = sortedValues(values)
+    n = len(keys)
+    tree = cls(capacity=n, typecode=typecode)
+    left, right, parent, color = tree.left, tree.right, tree.parent, tree.color
+    bottom = n.bit_length() - 1
+    stack = [(0, n, NIL, False, 0)]
+    while stack:
+      lo, hi, up, isLeft, depth = stack.pop()
+      if lo >= hi:
+        continue
+      mid = (lo + hi) // 2
+      z = mid + 1
+      tree.keys[z] = keys[mid]
+      parent[z] = up
+      tree.size[z] = hi - lo
+      color[z] = RED if depth == bottom else BLACK
+      if up == NIL:
+        tree.root = z
+      elif isLeft:
+        left[up] = z
+      else:
+        right[up] = z
+      stack.append((mid + 1, hi, z, False, depth + 1))
+      stack.append((lo, mid, z, True, depth + 1))
+    tree.count = n
+    color[tree.root] = BLACK
+    return tree
+
+  def inorder(self):
+    keys, left, right = self.keys, self.left, self.right
+    stack = []
+    x = self.root
+    while stack or x != NIL:
+      while x != NIL:
+        stack.append(x)
+        x = left[x]
+      x = stack.pop()
+      yield keys[x]
+      x = right[x]
+
+  def merge(self, other):
+    return type(self).fromSequence(
+      merge(self.inorder(), other.inorder()), typecode=self.typecode)
+
+  def Print(self):
+    self.render()
+
+  def _rootRef(self):
+    return self.root or None
+
+  def _leftOf(self, x):
+    return self.left[x] or None
+
+  def _rightOf(self, x):
+    return self.right[x] or None
+
+  def _keyOf(self, x):
+    return self.keys[x]
+
+  def __len__(self):
+    return self.count
+
+  def __contains__(self, value):
+    return self.search(value) != NIL
+
+  def _grow(self):
+    extra = len(self.left)
+    if self.typecode is None:
+      self.keys.extend([None] * extra)
+    else:
+      self.keys.extend(array(self.typecode, [0]) * extra)
+    self.left.extend(array('q', [NIL]) * extra)
+    self.right.extend(array('q', [NIL]) * extra)
+    self.parent.extend(array('q', [NIL]) * extra)
+    self.size.extend(array('q', [0]) * extra)
+    self.color.extend(bytes(extra))
+
+  def _newNode(self, value):
+    self.count += 1
+    z = self.count
+    if z == len(self.left):
+      self._grow()
+    self.keys[z] = value
+    self.left[z] = self.right[z] = self.parent[z] = NIL
+    self.size[z] = 1
+    self.color[z] = RED
+    return z
+
+  def search(self, value):
+    keys, left, right = self.keys, self.left, self.right
+    x = self.root
+    while x != NIL:
+      key = keys[x]
+      if value == key:
+        return x
+      x = left[x] if value < key else right[x]
+    return NIL
+
+  def addNode(self, value):
+    z = self._newNode(value)
+    keys, left, right, size = self.keys, self.left, self.right, self.size
+    y = NIL
+    x = self.root
+    while x != NIL:
+      size[x] += 1
+      y = x
+      x = left[x] if value < keys[x] else right[x]
+    self.parent[z] = y
+    if y == NIL:
+      self.root = z
+    elif value < keys[y]:
+      left[y] = z
+    else:
+      right[y] = z
+    self._fixInsert(z)
+
+  def _rotateLeft(self, x):
+    left, right, parent = self.left, self.right, self.parent
+    y = right[x]
+    right[x] = left[y]
+    if left[y] != NIL:
+      parent[left[y]] = x
+    parent[y] = parent[x]
+    if parent[x] == NIL:
+      self.root = y
+    elif x == left[parent[x]]:
+      left[parent[x]] = y
+    else:
+      right[parent[x]] = y
+    left[y] = x
+    parent[x] = y
+    self._resize(x, y)
+
+  def _rotateRight(self, x):
+    left, right, parent = self.left, self.right, self.parent
+    y = left[x]
+    left[x] = right[y]
+    if right[y] != NIL:
+      parent[right[y]] = x
+    parent[y] = parent[x]
+    if parent[x] == NIL:
+      self.root = y
+    elif x == right[parent[x]]:
+      right[parent[x]] = y
+    else:
+      left[parent[x]] = y
+    right[y] = x
+    parent[x] = y
+    self._resize(x, y)
+
+  def _resize(self, x, y):
+    size = self.size
+    size[y] = size[x]
+    size[x] = size[self.left[x]] + size[self.right[x]] + 1
+
+  def _fixInsert(self, z):
+    left, right, parent, color = self.left, self.right, self.parent, self.color
+    while color[parent[z]] == RED:
+      p = parent[z]
+      g = parent[p]
+      if p == left[g]:
+        uncle = right[g]
+        if color[uncle] == RED:
+          color[p] = color[uncle] = BLACK
+          color[g] = RED
+          z = g
+          continue
+        if z == right[p]:
+          z = p
+          self._rotateLeft(z)
+          p = parent[z]
+        color[p] = BLACK
+        color[g] = RED
+        self._rotateRight(g)
+      else:
+        uncle = left[g]
+        if color[uncle] == RED:
+          color[p] = color[uncle] = BLACK
+          color[g] = RED
+          z = g
+          continue
+        if z == left[p]:
+          z = p
+          self._rotateRight(z)
+          p = parent[z]
+        color[p] = BLACK
+        color[g] = RED
+        self._rotateLeft(g)
+    color[self.root] = BLACK
+
+  # Deletion (CLRS with the NIL sentinel). Sizes are decremented along the
+  # path of the spliced node, and the last array slot is moved into the
+  # freed one so node indices stay dense.
+
+  def delete(self, value):
+    z = self.search(value)
+    if z == NIL:
+      raise KeyError(value)
+    left, right, parent, color, size = (
+      self.left, self.right, self.parent, self.color, self.size)
+    y = z
+    yColor = color[y]
+    if left[z] == NIL:
+      x = right[z]
+      self._shrink(parent[z])
+      self._transplant(z, x)
+    elif right[z] == NIL:
+      x = left[z]
+      self._shrink(parent[z])
+      self._transplant(z, x)
+    else:
+      y = right[z]
+      while left[y] != NIL:
+        y = left[y]
+      yColor = color[y]
+      x = right[y]
+      self._shrink(parent[y])
+      if parent[y] == z:
+        parent[x] = y
+      else:
+        self._transplant(y, x)
+        right[y] = right[z]
+        parent[right[y]] = y
+      self._transplant(z, y)
+      left[y] = left[z]
+      parent[left[y]] = y
+      color[y] = color[z]
+      size[y] = size[z]
+    if yColor == BLACK:
+      self._fixDelete(x)
+    parent[NIL] = NIL
+    self._release(z)
+
+  def _shrink(self, x):
+    size, parent = self.size, self.parent
+    while x != NIL:
+      size[x] -= 1
+      x = parent[x]
+
+  def _transplant(self, u, v):
+    parent = self.parent
+    if parent[u] == NIL:
+      self.root = v
+    elif u == self.left[parent[u]]:
+      self.left[parent[u]] = v
+    else:
+      self.right[parent[u]] = v
+    parent[v] = parent[u]
+
+  def _fixDelete(self, x):
+    left, right, parent, color = self.left, self.right, self.parent, self.color
+    while x != self.root and color[x] == BLACK:
+      p = parent[x]
+      if x == left[p]:
+        w = right[p]
+        if color[w] == RED:
+          color[w] = BLACK
+          color[p] = RED
+          self._rotateLeft(p)
+          w = right[p]
+        if color[left[w]] == BLACK and color[right[w]] == BLACK:
+          color[w] = RED
+          x = p
+          continue
+        if color[right[w]] == BLACK:
+          color[left[w]] = BLACK
+          color[w] = RED
+          self._rotateRight(w)
+          w = right[p]
+        color[w] = color[p]
+        color[p] = color[right[w]] = BLACK
+        self._rotateLeft(p)
+      else:
+        w = left[p]
+        if color[w] == RED:
+          color[w] = BLACK
+          color[p] = RED
+          self._rotateRight(p)
+          w = left[p]
+        if color[left[w]] == BLACK and color[right[w]] == BLACK:
+          color[w] = RED
+          x = p
+          continue
+        if color[left[w]] == BLACK:
+          color[right[w]] = BLACK
+          color[w] = RED
+          self._rotateLeft(w)
+          w = left[p]
+        color[w] = color[p]
+        color[p] = color[left[w]] = BLACK
+        self._rotateRight(p)
+      x = self.root
+    color[x] = BLACK
+
+  def _release(self, z):
+    m = self.count
+    left, right, parent = self.left, self.right, self.parent
+    if z != m:
+      self.keys[z] = self.keys[m]
+      left[z], right[z], parent[z] = left[m], right[m], parent[m]
+      self.color[z] = self.color[m]
+      self.size[z] = self.size[m]
+      if self.root == m:
+        self.root = z
+      elif left[parent[m]] == m:
+        left[parent[m]] = z
+      else:
+        right[parent[m]] = z
+      if left[m] != NIL:
+        parent[left[m]] = z
+      if right[m] != NIL:
+        parent[right[m]] = z
+    if self.typecode is None:
+      self.keys[m] = None
+    self.count -= 1
+
+  # Order statistics: select(k) is the k-th smallest key (0-based),
+  # rank(x) counts keys < x, ranges are half-open [lo, hi).
+
+  def select(self, k):
+    if not 0 <= k < self.count:
+      raise IndexError('select index out of range')
+    left, right, size = self.left, self.right, self.size
+    x = self.root
+    while True:
+      smaller = size[left[x]]
+      if k < smaller:
+        x = left[x]
+      elif k == smaller:
+        return self.keys[x]
+      else:
+        k -= smaller + 1
+        x = right[x]
+
+  def rank(self, value):
+    keys, left, right, size = self.keys, self.left, self.right, self.size
+    result = 0
+    x = self.root
+    while x != NIL:
+      if keys[x] < value:
+        result += size[left[x]] + 1
+        x = right[x]
+      else:
+        x = left[x]
+    return result
+
+  def count_between(self, lo, hi):
+    return max(0, self.rank(hi) - self.rank(lo))
+
+  def range(self, lo, hi):
+    keys, left, right = self.keys, self.left, self.right
+    stack = []
+    x = self.root
+    while x != NIL:
+      if keys[x] < lo:
+        x = right[x]
+      else:
+        stack.append(x)
+        x = left[x]
+    while stack:
+      x = stack.pop()
+      key = keys[x]
+      if not key < hi:
+        return
+      yield key
+      x = right[x]
+      while x != NIL:
+        stack.append(x)
+        x = left[x]
+
+  def height(self):
+    level = [self.root] if self.root != NIL else []
+    depth = 0
+    while level:
+      depth += 1
+      level = [c for n in level for c in (self.left[n], self.right[n]) if c != NIL]
+    return depth
+
+# Snapshot mode: a persistent AVL tree of immutable tuple nodes
+# (key, left, right, height, size). Each insert copies only the search
+# path and publishes a new root, so readers grab the current root without
+# locking and keep a consistent view while the writer moves on.
+
+def _height(node):
+  return node[3] if node else 0
+
+def _size(node):
+  return node[4] if node else 0
+
+def _make(key, left, right):
+  return (key, left, right, max(_height(left), _height(right)) + 1,
+          _size(left) + _size(right) + 1)
+
+def _balance(key, left, right):
+  if _height(left) > _height(right) + 1:
+    lkey, ll, lr = left[:3]
+    if _height(ll) >= _height(lr):
+      return _make(lkey, ll, _make(key, lr, right))
+    return _make(lr[0], _make(lkey, ll, lr[1]), _make(key, lr[2], right))
+  if _height(right) > _height(left) + 1:
+    rkey, rl, rr = right[:3]
+    if _height(rr) >= _height(rl):
+      return _make(rkey, _make(key, left, rl), rr)
+    return _make(rl[0], _make(key, left, rl[1]), _make(rkey, rl[2], rr))
+  return _make(key, left, right)
+
+class Snapshot(TraversalMixin):
+  def __init__(self, root=None):
+    self.root = root
+
+  def __len__(self):
+    return _size(self.root)
+
+  def __contains__(self, value):
+    node = self.root
+    while node:
+      key = node[0]
+      if value == key:
+        return True
+      node = node[1] if value < key else node[2]
+    return False
+
+  def inorder(self):
+    stack = []
+    node = self.root
+    while stack or node:
+      while node:
+        stack.append(node)
+        node = node[1]
+      node = stack.pop()
+      yield node[0]
+      node = node[2]
+
+  def _rootRef(self):
+    return self.root
+
+  def _leftOf(self, node):
+    return node[1]
+
+  def _rightOf(self, node):
+    return node[2]
+
+  def _keyOf(self, node):
+    return node[0]
+
+class PersistentTree(Snapshot):
+  def __init__(self, list=()):
+    super().__init__()
+    self.writeLock = threading.Lock()
+    for i in list:
+      self.addNode(i)
+
+  def addNode(self, value):
+    with self.writeLock:
+      path = []
+      node = self.root
+      while node:
+        path.append(node)
+        node = node[1] if value < node[0] else node[2]
+      node = _make(value, None, None)
+      for up in reversed(path):
+        if value < up[0]:
+          node = _balance(up[0], node, up[2])
+        else:
+          node = _balance(up[0], up[1], node)
+      self.root = node
+
+  def snapshot(self):
+    return Snapshot(self.root)
+
+# Flat binary layout: a 16 byte header (magic, typecode, count) followed by
+# fixed-width keys in Eytzinger (BFS) order. The file is memory-mapped and
+# searched in place, so worker processes share one page-cached copy and
+# opening it costs nothing.
+
+class MappedTree:
+  HEADER = struct.Struct('<4sc3xq')
+  MAGIC = b'EYTZ'
+
+  @classmethod
+  def write(cls, path, sortedKeys, typecode='q'):
+    keys = array(typecode, sortedKeys)
+    n = len(keys)
+    layout = array(typecode, [0]) * n
+    stack = []
+    i = 0
+    k = 1
+    while stack or k <= n:
+      while k <= n:
+        stack.append(k)
+        k *= 2
+      k = stack.pop()
+      layout[k - 1] = keys[i]
+      i += 1
+      k = 2 * k + 1
+    with open(path, 'wb') as f:
+      f.write(cls.HEADER.pack(cls.MAGIC, typecode.encode(), n))
+      layout.tofile(f)
+
+  @classmethod
+  def open(cls, path):
+    with open(path, 'rb') as f:
+      data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, typecode, n = cls.HEADER.unpack_from(data)
+    if magic != cls.MAGIC:
+      data.close()
+      raise ValueError(f'{path} is not a saved tree')
+    return cls(data, typecode.decode(), n)
+
+  def __init__(self, data, typecode, count):
+    self.data = data
+    self.count = count
+    self.keys = memoryview(data)[self.HEADER.size:].cast(typecode)
+
+  def __len__(self):
+    return self.count
+
+  def __contains__(self, value):
+    return self.lower_bound(value) == value
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exc):
+    self.close()
+
+  def close(self):
+    self.keys.release()
+    self.data.close()
+
+  def lower_bound(self, value):
+    # smallest key >= value, or None
+    keys, n = self.keys, self.count
+    k = 1
+    while k <= n:
+      k = 2 * k + (keys[k - 1] < value)
+    k >>= (~k & (k + 1)).bit_length()
+    return keys[k - 1] if k else None
+
+  def inorder(self):
+    keys, n = self.keys, self.count
+    stack = []
+    k = 1
+    while stack or k <= n:
+      while k <= n:
+        stack.append(k)
+        k *= 2
+      k = stack.pop()
+      yield keys[k - 1]
+      k = 2 * k + 1
+
 treeValues = [ 10, 5, 15, 7, 2, 9, 31 ]
 tree = BinaryTree(treeValues)
 tree.Print()
+
+ranked = BalancedTree.fromSequence(treeValues)
+print(list(ranked.range(5, 15)), ranked.select(0), ranked.rank(9))
+ranked.delete(9)
+print(ranked.count_between(5, 15))
+# [5, 7, 9, 10] 2 3
+# 3
+
+import os
+import tempfile
+
+indexPath = os.path.join(tempfile.gettempdir(), 'tree.eytz')
+ranked.save(indexPath)
+with BinaryTree.open(indexPath) as mapped:
+  print(list(mapped.inorder()), 7 in mapped, 9 in mapped, mapped.lower_bound(11))
+# [2, 5, 7, 10, 15, 31] True False 15
+
+# Benchmark: Node-object tree vs array-backed red-black tree on sorted,
+# random and duplicate-heavy inputs (time and traced memory).
+
+import random
+import time
+import tracemalloc
+
+def benchmark(n=20000):
+  inputs = {
+    'sorted': list(range(n)),
+    'random': random.sample(range(n * 10), n),
+    'duplicates': [random.randrange(16) for _ in range(n)],
+  }
+  for name, values in inputs.items():
+    balanced = lambda values: BalancedTree(values, typecode='q')
+    for label, build in (('Node', BinaryTree), ('Balanced', balanced)):
+      # time and peak memory come from separate runs, tracing slows it down
+      start = time.perf_counter()
+      try:
+        built = build(values)
+        result = f'{time.perf_counter() - start:.3f}s'
+      except RecursionError:
+        built = None
+        result = 'RecursionError'
+      height = built.height() if isinstance(built, BalancedTree) else '-'
+      del built
+      tracemalloc.start()
+      try:
+        build(values)
+      except RecursionError:
+        pass
+      memory = tracemalloc.get_traced_memory()[1]
+      tracemalloc.stop()
+      print(f'{name:>10} {label:>8}: {result:>14} '
+            f'peak={memory / 1024:.0f}KiB height={height}')
+
+
+# Bulk loading vs one insert at a time, and merge vs re-inserting.
+
+def benchmarkBulk(n=20000):
+  values = random.sample(range(n * 10), n)
+  other = random.sample(range(n * 10), n)
+  cases = [
+    ('BinaryTree(list)', lambda: BinaryTree(values)),
+    ('BinaryTree.fromSequence', lambda: BinaryTree.fromSequence(values)),
+    ('BalancedTree(list)', lambda: BalancedTree(values)),
+    ('BalancedTree.fromSequence', lambda: BalancedTree.fromSequence(values)),
+    ('sorted input fromSequence', lambda: BalancedTree.fromSequence(range(n))),
+  ]
+  a = BalancedTree.fromSequence(values)
+  b = BalancedTree.fromSequence(other)
+  cases.append(('re-insert other', lambda: BalancedTree([*a.inorder(), *b.inorder()])))
+  cases.append(('a.merge(b)', lambda: a.merge(b)))
+  for label, build in cases:
+    start = time.perf_counter()
+    build()
+    print(f'{label:>26}: {time.perf_counter() - start:.3f}s')
+
+
+# Rendering a large tree into a buffered stream.
+
+import io
+
+def benchmarkRender(n=200000):
+  big = BalancedTree.fromSequence(range(n), typecode='q')
+  out = io.StringIO()
+  start = time.perf_counter()
+  big.render(out)
+  print(f'render {n} nodes: {time.perf_counter() - start:.3f}s, '
+        f'{len(out.getvalue()) / 1e6:.1f}MB')
+
+
+# Readers iterate snapshots while one writer keeps inserting.
+
+def benchmarkSnapshots(readers=4, seconds=0.5):
+  for readRatio in (0.5, 0.9, 0.99):
+    shared = PersistentTree(random.sample(range(100000), 10000))
+    stop = threading.Event()
+    reads = [0] * readers
+    writes = [0]
+
+    def reader(i):
+      while not stop.is_set():
+        view = shared.snapshot()
+        assert len(list(islice(view.inorder(), 100))) == min(100, len(view))
+        reads[i] += 1
+
+    def writer():
+      # one write per (1 - ratio) / ratio reads, paced by the readers
+      while not stop.is_set():
+        if writes[0] < sum(reads) * (1 - readRatio) / readRatio + 1:
+          shared.addNode(random.randrange(100000))
+          writes[0] += 1
+        else:
+          time.sleep(0)
+
+    threads = [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+    threads.append(threading.Thread(target=writer))
+    for t in threads:
+      t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+      t.join()
+    total = sum(reads) + writes[0]
+    print(f'read ratio {readRatio}: {total / seconds:,.0f} ops/s '
+          f'({sum(reads)} snapshot reads, {writes[0]} inserts)')
+
+if __name__ == '__main__':
+  benchmark()
+  benchmarkBulk()
+  benchmarkRender()
+  benchmarkSnapshots()
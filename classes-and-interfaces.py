@@ -44,29 +44,200 @@ def increment_with_report(current, increments):
     result = defaultdict(missing, current)
     for key, amount in increments:
         result[key] += amount
-        return result, added_count
+    return result, added_count
 
 result, count = increment_with_report(current, increments)
 assert count == 2
 
+# For heavy ingest: a counter store split into shards, each with its own
+# lock (lock striping), so concurrent writers rarely wait on each other.
+# The shards are striped by writer, not by key: a batch goes whole into
+# the first shard whose lock is free, in a single pass under that one
+# lock, so shards only fill up as far as writers actually collide. There
+# is one shard per CPU by default: a writer that finds every lock taken
+# has no core to run on anyway, and a spare shard would only cost memory
+# and the new-key checks below.
+# Routing every key to its own shard would cost an extra Python-level
+# pass per increment, which is more than the contention it saves. Reads
+# sum a key across the shards. Like increment_with_report, add() returns
+# how many keys were new. A shard's keys stay in insertion order, so the
+# keys a batch added to it are simply its last few, and only those are
+# checked against the set of keys known to the whole store.
+
+import os
+import threading
+import time
+from collections import Counter
+from itertools import islice
+
+class ShardedCounter:
+    def __init__(self, initial=None, shards=None):
+        if shards is None:
+            shards = os.cpu_count() or 1
+        self.shards = [defaultdict(int) for _ in range(shards)]
+        self.locks = [threading.Lock() for _ in range(shards)]
+        self.known = set()
+        self.known_lock = threading.Lock()
+        if initial:
+            self.add(initial.items())
+
+    def _acquire(self):
+        for index, lock in enumerate(self.locks):
+            if lock.acquire(blocking=False):
+                return index
+        index = threading.get_ident() % len(self.locks)
+        self.locks[index].acquire()
+        return index
+
+    def add(self, increments):
+        index = self._acquire()
+        shard = self.shards[index]
+        before = len(shard)
+        added = 0
+        try:
+            for key, amount in increments:
+                shard[key] += amount
+        finally:
+            # even if increments raised halfway, the keys it did write
+            # must be known, or another shard would count them again
+            fresh = list(islice(reversed(shard), len(shard) - before))
+            self.locks[index].release()
+            if fresh:
+                with self.known_lock:
+                    known = len(self.known)
+                    self.known.update(fresh)
+                    added = len(self.known) - known
+        return added
+
+    def __getitem__(self, key):
+        return sum(shard.get(key, 0) for shard in self.shards)
+
+    def snapshot(self):
+        # every lock, always in the same order, so the copy is consistent
+        for lock in self.locks:
+            lock.acquire()
+        try:
+            result = Counter()
+            for shard in self.shards:
+                result.update(shard)
+            return result
+        finally:
+            for lock in self.locks:
+                lock.release()
+
+    def merge(self, other):
+        counts = other.snapshot() if isinstance(other, ShardedCounter) else other
+        return self.add(counts.items())
+
+    def snapshot_every(self, interval, callback):
+        stop = threading.Event()
+
+        def run():
+            while not stop.wait(interval):
+                callback(self.snapshot())
+
+        threading.Thread(target=run, daemon=True).start()
+        return stop
+
+sharded = ShardedCounter(current)
+assert sharded.add(increments) == 2
+assert sharded.snapshot() == Counter(result)
+
+# Multi-threaded ingest: one global lock around a dict vs lock striping
+
+import random
+
+def benchmark_counters(threads=8, batches=200, batch_size=1000):
+    keys = [f'key{i}' for i in range(10000)]
+    work = [[(random.choice(keys), 1) for _ in range(batch_size)]
+            for _ in range(batches)]
+
+    plain = defaultdict(int)
+    plain_lock = threading.Lock()
+
+    def ingest_locked(chunk):
+        for batch in chunk:
+            with plain_lock:
+                for key, amount in batch:
+                    plain[key] += amount
+
+    store = ShardedCounter()
+
+    def ingest_sharded(chunk):
+        for batch in chunk:
+            store.add(batch)
+
+    for label, ingest in (('global lock', ingest_locked), ('sharded', ingest_sharded)):
+        workers = [threading.Thread(target=ingest, args=(work[i::threads],))
+                   for i in range(threads)]
+        start = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - start
+        print(f'{label}: {batches * batch_size / elapsed:,.0f} increments/s')
+    assert store.snapshot() == Counter(plain)
+
+if __name__ == '__main__':
+    benchmark_counters()
+
 # Item 39: Use @classmethod Polymorphism to Construct Objects Generically
 
 class InputData:
     def read(self):
         raise NotImplementedError
 
+    def read_chunks(self, size):
+        raise NotImplementedError
+
+    @classmethod
+    def generate_inputs(cls, config):
+        raise NotImplementedError
+
 #I also have a concrete subclass of InputData that reads data from a
 #file on disk:
 
 class PathInputData(InputData):
-    def __init__(self, path):
+    def __init__(self, path, start=0, end=None):
         super().__init__()
         self.path = path
+        self.start = start
+        self.end = end
     
     def read(self):
         with open(self.path) as f:
             return f.read()
 
+    # Streams the byte range [start, end) so memory stays bounded by the
+    # chunk size, however big the file is.
+    def read_chunks(self, size=1 << 20):
+        with open(self.path, 'rb') as f:
+            f.seek(self.start)
+            remaining = (os.path.getsize(self.path) if self.end is None
+                         else self.end) - self.start
+            while remaining > 0 and (chunk := f.read(min(size, remaining))):
+                remaining -= len(chunk)
+                yield chunk
+
+    # Generic construction: every file in config['data_dir'], with files
+    # bigger than config['split_bytes'] cut into byte ranges so one big
+    # file can still keep every worker busy.
+    @classmethod
+    def generate_inputs(cls, config):
+        data_dir = config['data_dir']
+        split = config.get('split_bytes')
+        for name in sorted(os.listdir(data_dir)):
+            path = os.path.join(data_dir, name)
+            if not os.path.isfile(path):
+                continue
+            size = os.path.getsize(path)
+            if not split or size <= split:
+                yield cls(path)
+                continue
+            for start in range(0, size, split):
+                yield cls(path, start, min(start + split, size))
+
 # again, an example that overshoots the point
 
 #@classmethod means: when this method is called, 
@@ -106,6 +277,77 @@ testdaughter = HeroDaughter()
 testdaughter.say_class_hello() #Outputs: "Hi Princess"
 testdaughter.say_hello() #Outputs: "Helllo..."
 
+# MapReduce on top of it: workers are built generically from whatever
+# inputs an InputData subclass generates, map() runs in a process pool and
+# the partial results are reduced as they come back. A worker only
+# streams chunks and ships its small result back, so memory stays flat.
+# Byte ranges don't respect line boundaries, so workers must only compute
+# things that add up across arbitrary splits (like counting newlines).
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+class Worker:
+    def __init__(self, input_data):
+        self.input_data = input_data
+        self.result = None
+
+    def map(self):
+        raise NotImplementedError
+
+    def reduce(self, other):
+        raise NotImplementedError
+
+    @classmethod
+    def create_workers(cls, input_class, config):
+        for input_data in input_class.generate_inputs(config):
+            yield cls(input_data)
+
+class LineCountWorker(Worker):
+    def map(self):
+        self.result = sum(chunk.count(b'\n') for chunk in self.input_data.read_chunks())
+
+    def reduce(self, other):
+        self.result += other.result
+
+def _run_map(worker):
+    worker.map()
+    worker.input_data = None  # only the result travels back
+    return worker
+
+def execute(workers, max_workers=None):
+    first = None
+    with ProcessPoolExecutor(max_workers) as pool:
+        futures = [pool.submit(_run_map, worker) for worker in workers]
+        for future in as_completed(futures):
+            worker = future.result()
+            if first is None:
+                first = worker
+            else:
+                first.reduce(worker)
+    return first.result if first else None
+
+def mapreduce(worker_class, input_class, config, max_workers=None):
+    workers = worker_class.create_workers(input_class, config)
+    return execute(workers, max_workers)
+
+import tempfile
+
+def benchmark_mapreduce(files=8, lines=200000):
+    data_dir = tempfile.mkdtemp()
+    for i in range(files):
+        with open(os.path.join(data_dir, f'part-{i}.txt'), 'w') as f:
+            f.writelines(f'row {j}\n' for j in range(lines))
+    config = {'data_dir': data_dir, 'split_bytes': 1 << 20}
+    for max_workers in range(1, (os.cpu_count() or 1) + 1):
+        start = time.perf_counter()
+        total = mapreduce(LineCountWorker, PathInputData, config, max_workers)
+        elapsed = time.perf_counter() - start
+        assert total == files * lines
+        print(f'{max_workers} process(es): {total:,} lines in {elapsed:.3f}s')
+
+if __name__ == '__main__':
+    benchmark_mapreduce()
+
 # Item 40: Initialize Parent Classes with super
 
 class Parent:
@@ -11,6 +11,299 @@ lengths = [63, 73, 72, 60, 67, 66, 71, 61, 72, 70]
 minimum, maximum = get_stats(lengths) # Two return values
 print(f'Min: {minimum}, Max: {maximum}')
 
+# StreamingStats keeps min, max, count, mean and variance (Welford) plus a
+# small merging t-digest for approximate quantiles, all updated in one pass.
+# NumPy arrays take a vectorized path: each fixed-size chunk is sorted with
+# np.sort and cut into centroids with the digest's own scale function, so
+# only the centroids (at most compression/2 per chunk) become Python
+# objects. merge() combines partial stats computed by different workers
+# or processes.
+
+import math
+
+try:
+  import numpy as np
+except ImportError:
+  np = None
+
+class TDigest:
+  def __init__(self, compression=100):
+    self.compression = compression
+    self.means = []
+    self.weights = []
+    self.buffer = []
+
+  def add(self, value, weight=1):
+    self.buffer.append((value, weight))
+    if len(self.buffer) >= 10 * self.compression:
+      self.compress()
+
+  def add_many(self, values):
+    self.buffer.extend(zip(values, [1] * len(values)))
+    if len(self.buffer) >= 10 * self.compression:
+      self.compress()
+
+  def add_centroids(self, means, weights):
+    self.buffer.extend(zip(means, weights))
+    if len(self.buffer) >= 10 * self.compression:
+      self.compress()
+
+  def merge(self, other):
+    other.compress()
+    self.buffer.extend(zip(other.means, other.weights))
+    self.compress()
+
+  def compress(self):
+    if not self.buffer:
+      return
+    points = sorted(self.buffer + list(zip(self.means, self.weights)))
+    self.buffer = []
+    total = sum(weight for _, weight in points)
+    means, weights = [], []
+    seen = 0
+    limit = self._k_limit(0, total)
+    mean, weight = points[0]
+    for value, w in points[1:]:
+      if seen + weight + w <= limit:
+        mean += (value - mean) * w / (weight + w)
+        weight += w
+      else:
+        means.append(mean)
+        weights.append(weight)
+        seen += weight
+        limit = self._k_limit(seen, total)
+        mean, weight = value, w
+    means.append(mean)
+    weights.append(weight)
+    self.means, self.weights = means, weights
+
+  def _k_limit(self, seen, total):
+    # k1 scale function: clusters are small near the tails, big in the middle
+    q = seen / total
+    k = self.compression / (2 * math.pi) * math.asin(2 * q - 1) + 1
+    return total * (math.sin(min(k, self.compression / 4) * 2 * math.pi / self.compression) + 1) / 2
+
+  def quantile(self, q):
+    self.compress()
+    if not self.means:
+      raise ValueError('quantile of empty digest')
+    total = sum(self.weights)
+    target = q * total
+    seen = 0
+    for i, weight in enumerate(self.weights):
+      if seen + weight / 2 >= target:
+        if i == 0:
+          return self.means[0]
+        # interpolate between neighbouring centroid centres
+        previous = seen - self.weights[i - 1] / 2
+        here = seen + weight / 2
+        t = (target - previous) / (here - previous)
+        return self.means[i - 1] + t * (self.means[i] - self.means[i - 1])
+      seen += weight
+    return self.means[-1]
+
+class StreamingStats:
+  def __init__(self, compression=100):
+    self.count = 0
+    self.mean = 0.0
+    self.m2 = 0.0
+    self.minimum = None
+    self.maximum = None
+    self.digest = TDigest(compression)
+
+  def update(self, numbers):
+    if np is not None and isinstance(numbers, np.ndarray):
+      return self._update_array(numbers.ravel())
+    count, mean, m2 = self.count, self.mean, self.m2
+    minimum, maximum = self.minimum, self.maximum
+    add = self.digest.add
+    for x in numbers:
+      count += 1
+      delta = x - mean
+      mean += delta / count
+      m2 += delta * (x - mean)
+      if minimum is None or x < minimum:
+        minimum = x
+      if maximum is None or x > maximum:
+        maximum = x
+      add(x)
+    self.count, self.mean, self.m2 = count, mean, m2
+    self.minimum, self.maximum = minimum, maximum
+    return self
+
+  def _update_array(self, values, chunk_size=1 << 20):
+    for start in range(0, len(values), chunk_size):
+      chunk = np.sort(values[start:start + chunk_size])
+      part = StreamingStats(self.digest.compression)
+      part.count = len(chunk)
+      part.mean = float(chunk.mean())
+      part.m2 = float(((chunk - part.mean) ** 2).sum())
+      part.minimum = chunk[0].item()
+      part.maximum = chunk[-1].item()
+      means, weights = self._centroids(chunk)
+      part.digest.add_centroids(means.tolist(), weights.tolist())
+      self.merge(part)
+    return self
+
+  def _centroids(self, ordered):
+    # one centroid per unit of the k1 scale, the same bound compress() uses
+    n = len(ordered)
+    q = np.arange(n) / n
+    k = np.floor(self.digest.compression / (2 * math.pi) * np.arcsin(2 * q - 1))
+    starts = np.flatnonzero(np.diff(k)) + 1
+    starts = np.concatenate(([0], starts))
+    weights = np.diff(np.append(starts, n))
+    means = np.add.reduceat(ordered.astype(np.float64), starts) / weights
+    return means, weights
+
+  def merge(self, other):
+    # Chan et al. parallel combination of mean and M2
+    if not other.count:
+      return self
+    if not self.count:
+      self.minimum, self.maximum = other.minimum, other.maximum
+    else:
+      self.minimum = min(self.minimum, other.minimum)
+      self.maximum = max(self.maximum, other.maximum)
+    count = self.count + other.count
+    delta = other.mean - self.mean
+    self.m2 += other.m2 + delta * delta * self.count * other.count / count
+    self.mean += delta * other.count / count
+    self.count = count
+    self.digest.merge(other.digest)
+    return self
+
+  def variance(self, ddof=0):
+    return self.m2 / (self.count - ddof) if self.count > ddof else float('nan')
+
+  def stdev(self, ddof=0):
+    return math.sqrt(self.variance(ddof))
+
+  def quantile(self, q):
+    return self.digest.quantile(q)
+
+# get_stats on top of it takes one pass and works on any iterator
+
+def get_stats(numbers):
+  stats = StreamingStats().update(numbers)
+  if not stats.count:
+    raise ValueError('get_stats() arg is an empty sequence')
+  return stats.minimum, stats.maximum
+
+minimum, maximum = get_stats(iter(lengths))
+stats = StreamingStats().update(iter(lengths))
+print(f'Mean: {stats.mean:.1f}, Median: {stats.quantile(0.5):.1f}')
+
+# get_stats_parallel: shard the input, build partial StreamingStats in a
+# process pool and merge them. Files are cut into byte ranges and a line
+# belongs to the shard it starts in, so no line is split or counted twice.
+# Arrays are copied once into shared memory and every worker reads its
+# slice from there instead of receiving a pickled copy.
+
+import os
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+def _file_shards(path, workers):
+  size = os.path.getsize(path)
+  step = max(1, -(-size // workers))
+  return [(path, start, min(start + step, size)) for start in range(0, size, step)]
+
+def _stats_for_range(path, start, end):
+  stats = StreamingStats()
+  with open(path, 'rb') as f:
+    if start:
+      f.seek(start - 1)
+      start += len(f.readline()) - 1  # finish the line the previous shard owns
+    def lines():
+      position = start
+      while position < end:
+        line = f.readline()
+        if not line:
+          return
+        position += len(line)
+        if line.strip():
+          yield float(line)
+    stats.update(lines())
+  return stats
+
+def _stats_for_slice(name, typecode, start, stop):
+  shm = shared_memory.SharedMemory(name=name)
+  try:
+    view = shm.buf.cast(typecode)[start:stop]
+    values = np.frombuffer(view, dtype=typecode) if np is not None else view
+    stats = StreamingStats().update(values)
+    del values
+    view.release()
+    return stats
+  finally:
+    shm.close()
+
+def get_stats_parallel(paths_or_array, workers=None):
+  workers = workers or os.cpu_count() or 1
+  result = StreamingStats()
+  with ProcessPoolExecutor(workers) as pool:
+    if isinstance(paths_or_array, (str, os.PathLike)):
+      paths_or_array = [paths_or_array]
+    if isinstance(paths_or_array, list) and all(
+        isinstance(p, (str, os.PathLike)) for p in paths_or_array):
+      shards = [shard for path in paths_or_array
+                for shard in _file_shards(path, workers)]
+      for partial in pool.map(_stats_for_range, *zip(*shards)):
+        result.merge(partial)
+      return result
+    values = paths_or_array
+    if isinstance(values, array):
+      typecode = values.typecode
+    else:
+      # lists, ranges, generators: one contiguous float64 buffer either way
+      typecode = 'd'
+      if np is None:
+        values = array('d', values)
+      elif hasattr(values, '__len__'):
+        values = np.ascontiguousarray(values, dtype='d')
+      else:
+        values = np.fromiter(values, dtype='d')
+    data = memoryview(values).cast('B')
+    if not len(data):
+      return result
+    shm = shared_memory.SharedMemory(create=True, size=len(data))
+    try:
+      shm.buf[:len(data)] = data
+      count = len(values)
+      step = -(-count // workers)
+      futures = [pool.submit(_stats_for_slice, shm.name, typecode, start,
+                             min(start + step, count))
+                 for start in range(0, count, step)]
+      for future in futures:
+        result.merge(future.result())
+    finally:
+      shm.close()
+      shm.unlink()
+  return result
+
+# Scaling from one worker up to every core
+
+import random
+import tempfile
+import time
+
+def benchmark_get_stats_parallel(lines=400000):
+  path = os.path.join(tempfile.mkdtemp(), 'telemetry.txt')
+  with open(path, 'w') as f:
+    f.writelines(f'{random.random() * 100:.3f}\n' for _ in range(lines))
+  for workers in range(1, (os.cpu_count() or 1) + 1):
+    start = time.perf_counter()
+    stats = get_stats_parallel(path, workers=workers)
+    elapsed = time.perf_counter() - start
+    assert stats.count == lines
+    print(f'{workers} worker(s): {lines / elapsed:,.0f} lines/s, '
+          f'min {stats.minimum}, max {stats.maximum}')
+
+if __name__ == '__main__':
+  benchmark_get_stats_parallel()
+
 # more than 3, API consumers could swap values
 
 # Item 20: Prefer Raising Exceptions to Returning None
@@ -82,6 +375,55 @@ def sort_priority3(numbers, group):
 #   ✦ Avoid using nonlocal statements for anything beyond simple
 #   functions.
 
+# At scale the helper closure is the cost: one Python call, one tuple and
+# one nonlocal store per element. Partitioning first avoids all of that.
+# One membership pass produces flags, compress splits the list into the
+# in-group and out-of-group buckets, and each bucket gets a plain key-free
+# sort. The result and the found flag are the same as sort_priority3.
+# NumPy arrays are partitioned with np.isin instead.
+
+from itertools import compress
+from operator import not_
+
+def sort_priority_partition(numbers, group):
+    if np is not None and isinstance(numbers, np.ndarray):
+        # let NumPy pick the members' dtype: casting them to numbers.dtype
+        # would turn 2.5 into 2 or overflow on -1 for unsigned arrays
+        members = np.array(list(group))
+        if members.dtype.kind not in 'biuf':
+            members = np.array(list(group), dtype=object)
+        mask = np.isin(numbers, members)
+        front = np.sort(numbers[mask])
+        back = np.sort(numbers[~mask])
+        numbers[:len(front)] = front
+        numbers[len(front):] = back
+        return bool(len(front))
+    flags = list(map(group.__contains__, numbers))
+    front = list(compress(numbers, flags))
+    back = list(compress(numbers, map(not_, flags)))
+    front.sort()
+    back.sort()
+    numbers[:] = front
+    numbers += back
+    return bool(front)
+
+def benchmark_sort_priority(size=1000000):
+    ids = [random.randrange(size * 10) for _ in range(size)]
+    group = set(random.sample(range(size * 10), size // 10))
+    closure = list(ids)
+    start = time.perf_counter()
+    found = sort_priority3(closure, group)
+    closure_time = time.perf_counter() - start
+    partitioned = list(ids)
+    start = time.perf_counter()
+    assert sort_priority_partition(partitioned, group) == found
+    partition_time = time.perf_counter() - start
+    assert partitioned == closure
+    print(f'closure key: {closure_time:.3f}s, partition: {partition_time:.3f}s')
+
+if __name__ == '__main__':
+    benchmark_sort_priority()
+
 # Item 22: Reduce Visual Noise with Variable Positional Arguments
 
 def log(message, values):
@@ -169,4 +511,243 @@ def safe_division_c(number, divisor, *, # Changed
 # another function at runtime.
 # ✦ Using decorators can cause strange behaviors in tools that do introspection, such as debuggers.
 # ✦ Use the wraps decorator from the functools built-in module when
-# you define your own decorators to avoid issues.
\ No newline at end of file
+# you define your own decorators to avoid issues.
+
+# A small decorator toolkit built that way. Each decorator keeps its state
+# on an object hung off the wrapper (wrapper.cache, wrapper.timer,
+# wrapper.profiler) and can be switched off at runtime with
+# .enabled = False, after which the wrapper costs one attribute check.
+
+import cProfile
+import functools
+import io
+import pstats
+import threading
+from collections import OrderedDict
+
+# @memoize: LRU cache with optional TTL. typed=True keeps 1 and 1.0 apart.
+# Like functools.lru_cache it is thread-safe: a lock guards the bookkeeping
+# but is not held while the function runs, so two threads missing the same
+# key may both compute it. An expired entry is dropped when it is looked
+# up, and at most once per ttl a sweep drops every expired entry, so keys
+# that are never asked for again don't linger.
+
+class _MemoizeState:
+    def __init__(self, maxsize, ttl, typed):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.typed = typed
+        self.enabled = True
+        self.entries = OrderedDict()   # key -> (value, stored at)
+        self.hits = self.misses = 0
+        self.lock = threading.Lock()
+        self.next_purge = 0.0
+
+    def key(self, args, kwargs):
+        key = args
+        if kwargs:
+            key += (_KWARGS_MARK,) + tuple(sorted(kwargs.items()))
+        if self.typed:
+            key += tuple(type(v) for v in args)
+            key += tuple(type(v) for _, v in sorted(kwargs.items()))
+        return key
+
+    def purge(self, now):
+        expired = [key for key, (_, stored) in self.entries.items()
+                   if now - stored > self.ttl]
+        for key in expired:
+            del self.entries[key]
+        self.next_purge = now + self.ttl
+
+    def info(self):
+        with self.lock:
+            return {'hits': self.hits, 'misses': self.misses,
+                    'size': len(self.entries), 'maxsize': self.maxsize}
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.hits = self.misses = 0
+
+_KWARGS_MARK = object()
+
+def memoize(maxsize=128, ttl=None, typed=False):
+    def decorator(func):
+        cache = _MemoizeState(maxsize, ttl, typed)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not cache.enabled:
+                return func(*args, **kwargs)
+            key = cache.key(args, kwargs)
+            with cache.lock:
+                entry = cache.entries.get(key)
+                if entry is not None:
+                    if cache.ttl is None or time.monotonic() - entry[1] <= cache.ttl:
+                        cache.hits += 1
+                        cache.entries.move_to_end(key)
+                        return entry[0]
+                    del cache.entries[key]
+                cache.misses += 1
+            value = func(*args, **kwargs)
+            with cache.lock:
+                now = time.monotonic()
+                cache.entries[key] = (value, now)
+                cache.entries.move_to_end(key)
+                if cache.ttl is not None and now >= cache.next_purge:
+                    cache.purge(now)
+                if cache.maxsize is not None and len(cache.entries) > cache.maxsize:
+                    cache.entries.popitem(last=False)
+            return value
+
+        wrapper.cache = cache
+        return wrapper
+    return decorator
+
+# @timed: latency histogram with power-of-two nanosecond buckets (bucket i
+# holds calls that took < 2**i ns). sample_every=N only times one call in
+# N, so hot functions pay for the clock reads rarely.
+
+class _TimerState:
+    def __init__(self, sample_every):
+        self.sample_every = sample_every
+        self.enabled = True
+        self.calls = 0
+        self.buckets = array('Q', [0]) * 64
+        self.total_ns = 0
+
+    def record(self, elapsed_ns):
+        self.buckets[elapsed_ns.bit_length()] += 1
+        self.total_ns += elapsed_ns
+
+    def count(self):
+        return sum(self.buckets)
+
+    def percentile(self, q):
+        # upper bound of the bucket holding the q-th sample, in ns
+        target = q * self.count()
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if n and seen >= target:
+                return 1 << i
+        return 0
+
+    def reset(self):
+        self.buckets = array('Q', [0]) * 64
+        self.total_ns = self.calls = 0
+
+def timed(func=None, *, sample_every=1):
+    def decorator(func):
+        timer = _TimerState(sample_every)
+        clock = time.perf_counter_ns
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not timer.enabled:
+                return func(*args, **kwargs)
+            timer.calls += 1
+            if timer.calls % timer.sample_every:
+                return func(*args, **kwargs)
+            start = clock()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                timer.record(clock() - start)
+
+        wrapper.timer = timer
+        return wrapper
+    return decorator if func is None else decorator(func)
+
+# @profiled: cProfile for just this function, off until switched on.
+# Calls made while it's on are collected into one Profile.
+#
+# Only one profiler can be hooked in at a time, and it sees everything its
+# thread calls. So a profiled call made inside another one (recursion, or
+# one profiled function calling another) just runs, and its time shows up
+# in the outer report. Only one thread is profiled at a time: a call from
+# another thread while that's going on runs unprofiled and is counted in
+# profiler.skipped.
+
+_profiling = threading.local()
+_profiling_lock = threading.Lock()
+
+class _ProfilerState:
+    def __init__(self):
+        self.enabled = False
+        self.profile = cProfile.Profile()
+        self.skipped = 0
+
+    def report(self, sort='cumulative', limit=20):
+        out = io.StringIO()
+        pstats.Stats(self.profile, stream=out).sort_stats(sort).print_stats(limit)
+        return out.getvalue()
+
+    def reset(self):
+        self.profile = cProfile.Profile()
+        self.skipped = 0
+
+def profiled(func):
+    profiler = _ProfilerState()
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not profiler.enabled or getattr(_profiling, 'active', False):
+            return func(*args, **kwargs)
+        if not _profiling_lock.acquire(blocking=False):
+            profiler.skipped += 1
+            return func(*args, **kwargs)
+        _profiling.active = True
+        try:
+            return profiler.profile.runcall(func, *args, **kwargs)
+        finally:
+            _profiling.active = False
+            _profiling_lock.release()
+
+    wrapper.profiler = profiler
+    return wrapper
+
+@memoize(maxsize=256)
+def fibonacci(n):
+    return n if n < 2 else fibonacci(n - 1) + fibonacci(n - 2)
+
+@timed(sample_every=4)
+def checksum(data):
+    return sum(data) % 255
+
+@profiled
+def work(n):
+    return sorted(str(i) for i in range(n))
+
+print(fibonacci(80), fibonacci.cache.info(), fibonacci.__name__)
+for _ in range(1000):
+    checksum(b'effective python')
+print(checksum.timer.count(), checksum.timer.percentile(0.5))
+work.profiler.enabled = True
+work(10000)
+work.profiler.enabled = False
+print(work.profiler.report(limit=3))
+
+# Overhead with everything switched off
+
+def benchmark_decorator_overhead(calls=1000000):
+    def plain(x):
+        return x
+
+    memoized, timed_plain, profiled_plain = memoize()(plain), timed(plain), profiled(plain)
+    memoized.cache.enabled = False
+    timed_plain.timer.enabled = False
+    start = time.perf_counter()
+    for i in range(calls):
+        plain(i)
+    base = time.perf_counter() - start
+    for label, wrapper in (('memoize', memoized), ('timed', timed_plain),
+                           ('profiled', profiled_plain)):
+        start = time.perf_counter()
+        for i in range(calls):
+            wrapper(i)
+        overhead = (time.perf_counter() - start - base) / calls
+        print(f'@{label} disabled: {overhead * 1e9:.0f} ns/call')
+
+if __name__ == '__main__':
+    benchmark_decorator_overhead()
@@ -122,6 +122,118 @@ print('By weight:', tools)
 tools.sort(key=lambda x: (x.weight, x.name))
 print(tools)
 
+# Re-sorting the same inventory over and over builds a key tuple per object
+# per sort. A columnar container stores each field in its own list, keeps
+# rows as tiny __slots__ views, and caches the sorted permutation of row
+# indexes for every key combination it has been asked for. Appends insert
+# the new index into each cached permutation with bisect, so sorting again
+# by (weight, name) is a dictionary lookup, not a sort.
+#
+# order() hands out the permutation as a tuple, so callers can't corrupt the
+# cache, and sorted() returns a SortedRows view that builds a Row only for
+# the positions actually read.
+
+from bisect import insort
+from collections.abc import Sequence
+
+class Row:
+    __slots__ = ('table', 'index')
+
+    def __init__(self, table, index):
+        self.table = table
+        self.index = index
+
+    def __getattr__(self, field):
+        try:
+            return self.table.columns[field][self.index]
+        except KeyError:
+            raise AttributeError(field) from None
+
+    def __repr__(self):
+        values = ', '.join(repr(self.table.columns[field][self.index])
+                           for field in self.table.fields)
+        return f'Row({values})'
+
+class SortedRows(Sequence):
+    __slots__ = ('table', 'order')
+
+    def __init__(self, table, order):
+        self.table = table
+        self.order = order
+
+    def __len__(self):
+        return len(self.order)
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return SortedRows(self.table, self.order[position])
+        return Row(self.table, self.order[position])
+
+    def __iter__(self):
+        table = self.table
+        for index in self.order:
+            yield Row(table, index)
+
+    def column(self, field):
+        values = self.table.columns[field]
+        return [values[i] for i in self.order]
+
+    def __repr__(self):
+        return repr(list(self))
+
+class ColumnarTable:
+    def __init__(self, fields, records=()):
+        self.fields = tuple(fields)
+        self.columns = {field: [] for field in self.fields}
+        self.orders = {}      # key fields -> sorted row indexes
+        self.frozen = {}      # key fields -> tuple copy handed to callers
+        for record in records:
+            self.append(*record)
+
+    @classmethod
+    def from_objects(cls, fields, objects):
+        return cls(fields, ([getattr(o, field) for field in fields] for o in objects))
+
+    def __len__(self):
+        return len(self.columns[self.fields[0]])
+
+    def __getitem__(self, index):
+        if not -len(self) <= index < len(self):
+            raise IndexError('row index out of range')
+        return Row(self, index % len(self))
+
+    def _key(self, key):
+        columns = [self.columns[field] for field in key]
+        if len(columns) == 1:
+            return columns[0].__getitem__
+        return lambda i: tuple(column[i] for column in columns)
+
+    def append(self, *values):
+        index = len(self)
+        for field, value in zip(self.fields, values, strict=True):
+            self.columns[field].append(value)
+        for key, order in self.orders.items():
+            insort(order, index, key=self._key(key))
+        self.frozen.clear()
+
+    def order(self, *key):
+        frozen = self.frozen.get(key)
+        if frozen is None:
+            order = self.orders.get(key)
+            if order is None:
+                order = self.orders[key] = sorted(range(len(self)), key=self._key(key))
+            frozen = self.frozen[key] = tuple(order)
+        return frozen
+
+    def sorted(self, *key):
+        return SortedRows(self, self.order(*key))
+
+inventory = ColumnarTable.from_objects(('name', 'weight'), tools)
+print(inventory.sorted('weight', 'name'))
+inventory.append('drill', 1.0)
+print(inventory.sorted('weight', 'name').column('name'))
+# ['chisel', 'screwdriver', 'drill', 'hammer', 'level']
+
 #Item 15: Be Cautious When Relying on dict Insertion Ordering
 
 # dict Python 3.5 > Random order. All methods too.
@@ -211,16 +323,492 @@ def open_picture(profile_path):
 #  implement the __missing__ special method 
 #  to add custom logic for handling missing keys
 
+# The plain version keeps every handle open forever. This one is a bounded
+# cache: LRU or LFU eviction, a cap on entries and on open handles, an
+# optional TTL, and hit/miss/eviction counters. Evicted handles are closed,
+# and pictures[path] still works like a dict lookup. Writes through the
+# dict API (pictures[path] = handle, del, pop, update...) go through the
+# same bookkeeping; pop hands the handle over without closing it.
+#
+# It is also safe to share between threads. Concurrent misses on the same
+# path are single-flight: the first thread runs the opener and the others
+# wait on that key's event, so no handle is opened twice and leaked. The
+# lock only guards the bookkeeping; it is never held while opening. Hits
+# don't take it either: the entry is read straight from the dict and the
+# key is queued in a deque, and the queued recency/frequency updates are
+# applied in batches whenever the lock is next held (or, every 64 hits,
+# if it happens to be free). Eviction order is therefore a little stale
+# under load, which is the usual trade for lock-free reads.
+#
+# A handle returned by pictures[path] can be evicted and closed by another
+# thread at any time. To read from it safely, check it out:
+#
+#   with pictures.checkout(path) as handle:
+#     ...
+#
+# A checked-out handle is pinned. Evicting it only drops it from the cache;
+# the close is deferred until the last checkout ends. Deferred handles still
+# count towards open_count.
+#
+# With use_mmap=True each entry is a MappedPicture: the file is mapped
+# read-only and entry.view is a memoryview over it, so headers can be
+# sliced and chunks sent to sockets without copying the payload into a
+# new bytes object. mapped_bytes tracks how much is mapped, and
+# max_mapped_bytes bounds it like max_open bounds handles.
+
+import mmap
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager, contextmanager
+
+class _Flight:
+  def __init__(self):
+    self.done = threading.Event()
+    self.value = None
+    self.error = None
+
+class MappedPicture:
+  def __init__(self, handle):
+    self.size = os.fstat(handle.fileno()).st_size
+    # mmap keeps its own descriptor, so the handle can go right away
+    self.map = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) if self.size else None
+    handle.close()
+    self.view = memoryview(self.map) if self.map else memoryview(b'')
+    self.closed = False
+
+  def close(self):
+    self.closed = True
+    try:
+      self.view.release()
+      if self.map:
+        self.map.close()
+    except BufferError:
+      pass  # a caller still holds a slice; the map goes when it does
+    self.view = self.map = None
+
 class Pictures(dict):
+  def __init__(self, maxsize=None, policy='lru', max_open=None, ttl=None,
+               opener=open_picture, use_mmap=False, max_mapped_bytes=None):
+    super().__init__()
+    if policy not in ('lru', 'lfu'):
+      raise ValueError(f'Unknown eviction policy {policy!r}')
+    self.maxsize = maxsize
+    self.policy = policy
+    self.max_open = max_open
+    self.ttl = ttl
+    self.opener = opener
+    self.hits = self.misses = self.evictions = 0
+    self.open_count = 0
+    self.loaded_at = {}
+    self.recency = OrderedDict()          # lru: key -> None, oldest first
+    self.freq = {}                        # lfu: key -> use count
+    self.buckets = defaultdict(OrderedDict)  # lfu: count -> keys
+    self.min_freq = 0
+    self.lock = threading.Lock()
+    self.loading = {}                     # key -> in-flight load
+    self.use_mmap = use_mmap
+    self.max_mapped_bytes = max_mapped_bytes
+    self.mapped_bytes = 0
+    self.pending = deque()                # keys hit without the lock
+    self.pins = {}                        # id(value) -> checkouts
+    self.retired = {}                     # id(value) -> evicted while pinned
+
+  def __getitem__(self, key):
+    value = dict.get(self, key)
+    loaded = self.loaded_at.get(key)
+    if value is not None and loaded is not None and (
+        self.ttl is None or time.monotonic() - loaded <= self.ttl):
+      self.pending.append(key)
+      if len(self.pending) >= 64 and self.lock.acquire(blocking=False):
+        try:
+          self._drain()
+        finally:
+          self.lock.release()
+      return value
+    return self.__missing__(key)
+
+  def _drain(self):
+    while self.pending:
+      key = self.pending.popleft()
+      self.hits += 1
+      if dict.__contains__(self, key):
+        self._touch(key)
+
+  @contextmanager
+  def checkout(self, key):
+    value = self[key]
+    while not self._pin(value):
+      value = self[key]
+    try:
+      yield value
+    finally:
+      self._unpin(value)
+
+  def _pin(self, value):
+    with self.lock:
+      # it may have been evicted and closed before we got the lock
+      if value.closed:
+        return False
+      self.pins[id(value)] = self.pins.get(id(value), 0) + 1
+      return True
+
+  def _unpin(self, value):
+    with self.lock:
+      count = self.pins.pop(id(value)) - 1
+      if count:
+        self.pins[id(value)] = count
+      elif self.retired.pop(id(value), None) is not None:
+        value.close()
+        self.open_count -= 1
+
   def __missing__(self, key):
-    value = open_picture(key)
-    self[key] = value
+    with self.lock:
+      self._drain()
+      if self._lookup(key):
+        return dict.__getitem__(self, key)
+      flight = self.loading.get(key)
+      leader = flight is None
+      if leader:
+        flight = self.loading[key] = _Flight()
+        self.misses += 1
+      else:
+        self.hits += 1
+    if not leader:
+      flight.done.wait()
+      if flight.error is not None:
+        raise flight.error
+      return flight.value
+    try:
+      flight.value = self._wrap(self.opener(key))
+    except BaseException as e:
+      flight.error = e
+      raise
+    else:
+      with self.lock:
+        self._store(key, flight.value)
+      return flight.value
+    finally:
+      with self.lock:
+        del self.loading[key]
+      flight.done.set()
+
+  def _lookup(self, key):
+    if not dict.__contains__(self, key):
+      return False
+    if self.ttl is not None and time.monotonic() - self.loaded_at[key] > self.ttl:
+      self._evict(key)
+      self.evictions += 1
+      return False
+    self.hits += 1
+    self._touch(key)
+    return True
+
+  def _wrap(self, handle):
+    return MappedPicture(handle) if self.use_mmap else handle
+
+  def _store(self, key, value):
+    incoming = value.size if self.use_mmap else 0
+    self._make_room(incoming)
+    dict.__setitem__(self, key, value)
+    if not value.closed:
+      self.open_count += 1
+    self.mapped_bytes += incoming
+    self.loaded_at[key] = time.monotonic()
+    if self.policy == 'lru':
+      self.recency[key] = None
+    else:
+      self.freq[key] = 1
+      self.buckets[1][key] = None
+      self.min_freq = 1
+
+  def _touch(self, key):
+    if self.policy == 'lru':
+      self.recency.move_to_end(key)
+      return
+    count = self.freq[key]
+    del self.buckets[count][key]
+    if not self.buckets[count]:
+      del self.buckets[count]
+      if self.min_freq == count:
+        self.min_freq = count + 1
+    self.freq[key] = count + 1
+    self.buckets[count + 1][key] = None
+
+  def _victim(self):
+    if self.policy == 'lru':
+      return next(iter(self.recency))
+    if self.min_freq not in self.buckets:
+      self.min_freq = min(self.buckets)
+    return next(iter(self.buckets[self.min_freq]))
+
+  def _make_room(self, incoming=0):
+    self._drain()
+    while len(self) and (
+        (self.maxsize is not None and len(self) >= self.maxsize) or
+        (self.max_open is not None and self.open_count >= self.max_open) or
+        (self.max_mapped_bytes is not None and
+         self.mapped_bytes + incoming > self.max_mapped_bytes)):
+      self._evict(self._victim())
+      self.evictions += 1
+
+  def _forget(self, key):
+    value = dict.pop(self, key)
+    del self.loaded_at[key]
+    if self.policy == 'lru':
+      del self.recency[key]
+    else:
+      count = self.freq.pop(key)
+      del self.buckets[count][key]
+      if not self.buckets[count]:
+        del self.buckets[count]
+    if self.use_mmap:
+      self.mapped_bytes -= value.size
     return value
 
+  def _evict(self, key):
+    value = self._forget(key)
+    if id(value) in self.pins:
+      self.retired[id(value)] = value
+    elif not value.closed:
+      value.close()
+      self.open_count -= 1
+
+  def evict(self, key):
+    with self.lock:
+      self._evict(key)
+
+  def close(self):
+    with self.lock:
+      for key in list(self):
+        self._evict(key)
+
+  # dict API writes
+
+  def __setitem__(self, key, value):
+    if self.use_mmap and not isinstance(value, MappedPicture):
+      value = MappedPicture(value)
+    with self.lock:
+      if dict.__contains__(self, key):
+        if dict.__getitem__(self, key) is value:
+          return
+        self._evict(key)
+      self._store(key, value)
+
+  def __delitem__(self, key):
+    with self.lock:
+      if not dict.__contains__(self, key):
+        raise KeyError(key)
+      self._evict(key)
+
+  def pop(self, key, *default):
+    with self.lock:
+      if not dict.__contains__(self, key):
+        if default:
+          return default[0]
+        raise KeyError(key)
+      value = self._forget(key)
+      if not value.closed:
+        self.open_count -= 1
+      return value
+
+  def popitem(self):
+    with self.lock:
+      if not len(self):
+        raise KeyError('popitem(): cache is empty')
+      key = next(reversed(dict.keys(self)))
+    return key, self.pop(key)
+
+  def clear(self):
+    self.close()
+
+  def update(self, *args, **kwargs):
+    for key, value in dict(*args, **kwargs).items():
+      self[key] = value
+
+  def setdefault(self, key, default=None):
+    if not dict.__contains__(self, key):
+      self[key] = default
+    return dict.__getitem__(self, key)
+
+  def stats(self):
+    with self.lock:
+      self._drain()
+    return {'hits': self.hits, 'misses': self.misses,
+            'evictions': self.evictions, 'entries': len(self),
+            'open': self.open_count, 'mapped_bytes': self.mapped_bytes}
+
+# asyncio flavour: the opener is a coroutine and lookups are awaited,
+# handle = await pictures[path]. Everything runs on one event loop, so the
+# single-flight record is just the Task running the load. It runs on its
+# own rather than inside the first requester, and every requester awaits it
+# through asyncio.shield, so cancelling one of them (a client went away)
+# doesn't cancel the load for the others.
+
+import asyncio
+
+async def open_picture_async(profile_path):
+  return await asyncio.to_thread(open_picture, profile_path)
+
+class AsyncPictures(Pictures):
+  def __init__(self, maxsize=None, policy='lru', max_open=None, ttl=None,
+               opener=open_picture_async, use_mmap=False, max_mapped_bytes=None):
+    super().__init__(maxsize, policy, max_open, ttl, opener, use_mmap,
+                     max_mapped_bytes)
+
+  async def __getitem__(self, key):
+    if self._lookup(key):
+      return dict.__getitem__(self, key)
+    task = self.loading.get(key)
+    if task is None:
+      self.misses += 1
+      task = self.loading[key] = asyncio.ensure_future(self._load(key))
+      # mark the error retrieved even if every requester was cancelled
+      task.add_done_callback(lambda t: t.cancelled() or t.exception())
+    else:
+      self.hits += 1
+    return await asyncio.shield(task)
+
+  async def _load(self, key):
+    try:
+      value = self._wrap(await self.opener(key))
+      self._store(key, value)
+      return value
+    finally:
+      del self.loading[key]
+
+  @asynccontextmanager
+  async def checkout(self, key):
+    value = await self[key]
+    while not self._pin(value):
+      value = await self[key]
+    try:
+      yield value
+    finally:
+      self._unpin(value)
+
 pictures = {}
 path = 'profile_1234.png'
 
 pictures = Pictures()
 handle = pictures[path]
 handle.seek(0)
-image_data = handle.read()
\ No newline at end of file
+image_data = handle.read()
+
+# Replay Zipf-distributed path access against both eviction policies
+
+import os
+import random
+import tempfile
+
+def benchmark_pictures(paths=200, requests=20000, maxsize=32, skew=1.1):
+  folder = tempfile.mkdtemp()
+  names = [os.path.join(folder, f'profile_{i}.png') for i in range(paths)]
+  weights = [1 / (rank + 1) ** skew for rank in range(paths)]
+  trace = random.choices(names, weights, k=requests)
+  for policy in ('lru', 'lfu'):
+    cache = Pictures(maxsize=maxsize, policy=policy)
+    start = time.perf_counter()
+    for name in trace:
+      cache[name]
+    elapsed = time.perf_counter() - start
+    stats = cache.stats()
+    cache.close()
+    print(f'{policy}: {requests / elapsed:,.0f} req/s, '
+          f'hit rate {stats["hits"] / requests:.1%}, {stats}')
+
+if __name__ == '__main__':
+  benchmark_pictures()
+
+# Stress: hundreds of concurrent requesters, exactly one open per key
+
+import collections
+
+def stress_pictures(requesters=300, keys=10):
+  opens = collections.Counter()
+
+  def slow_open(path):
+    opens[path] += 1
+    time.sleep(0.01)
+    return open(os.devnull, 'rb')
+
+  cache = Pictures(opener=slow_open)
+  barrier = threading.Barrier(requesters)
+
+  def request(i):
+    barrier.wait()
+    cache[f'profile_{i % keys}.png']
+
+  threads = [threading.Thread(target=request, args=(i,)) for i in range(requesters)]
+  for t in threads:
+    t.start()
+  for t in threads:
+    t.join()
+  assert len(opens) == keys and set(opens.values()) == {1}, opens
+  print('threads:', cache.stats())
+  cache.close()
+
+  async_opens = collections.Counter()
+
+  async def slow_open_async(path):
+    async_opens[path] += 1
+    await asyncio.sleep(0.01)
+    return open(os.devnull, 'rb')
+
+  async def main():
+    async_cache = AsyncPictures(opener=slow_open_async)
+    await asyncio.gather(*(async_cache[f'profile_{i % keys}.png']
+                           for i in range(requesters)))
+    print('asyncio:', async_cache.stats())
+    async_cache.close()
+
+  asyncio.run(main())
+  assert len(async_opens) == keys and set(async_opens.values()) == {1}, async_opens
+
+  # maxsize=1 evicts on nearly every request; checked-out handles must stay
+  # readable until the reader is done with them
+  folder = tempfile.mkdtemp()
+  names = []
+  for i in range(keys):
+    names.append(os.path.join(folder, f'profile_{i}.png'))
+    with open(names[-1], 'wb') as f:
+      f.write(bytes([i]) * 64)
+  small = Pictures(maxsize=1, opener=lambda path: open(path, 'rb'))
+  failures = []
+
+  def read(i):
+    barrier.wait()
+    for j in range(20):
+      with small.checkout(names[(i + j) % keys]) as handle:
+        time.sleep(0)
+        data = os.pread(handle.fileno(), 64, 0)
+        if data != bytes([(i + j) % keys]) * 64:
+          failures.append(data)
+
+  threads = [threading.Thread(target=read, args=(i,)) for i in range(requesters)]
+  for t in threads:
+    t.start()
+  for t in threads:
+    t.join()
+  small.close()
+  assert not failures, failures[:3]
+  assert small.open_count == 0 and not small.pins and not small.retired
+  print('checkout:', small.stats())
+
+if __name__ == '__main__':
+  stress_pictures()
+
+# Zero-copy access: slice the header straight out of the mapping
+
+image_path = os.path.join(tempfile.mkdtemp(), 'profile_5678.png')
+with open(image_path, 'wb') as f:
+  f.write(b'\x89PNG\r\n\x1a\n' + bytes(4096))
+
+mapped_pictures = Pictures(use_mmap=True, max_mapped_bytes=1 << 20)
+entry = mapped_pictures[image_path]
+header = entry.view[:8]
+print(bytes(header), entry.size, mapped_pictures.stats()['mapped_bytes'])
+# b'\x89PNG\r\n\x1a\n' 4104 4104
+header.release()
+mapped_pictures.close()